@@ -0,0 +1,93 @@
+import json
+import logging
+import logging.handlers
+import queue
+import threading
+import time
+
+class JsonFormatter(logging.Formatter):
+    # formats every record as one JSON object per line, structured fields are passed with extra={'details': {...}}
+    def format(self, record: logging.LogRecord) -> str:
+        log_entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            **getattr(record, 'details', {})
+        }
+        return json.dumps(log_entry)
+
+class BoardProgress:
+    # aggregates the operations of a board into progress lines which are logged at most every log_interval seconds
+    def __init__(self, board_title: str, total_tasks: int, total_subtasks: int, log_interval: float = 5.0) -> None:
+        self.board_title = board_title
+        self.total_tasks = total_tasks
+        self.total_subtasks = total_subtasks
+        self.log_interval = log_interval
+
+        self.tasks = 0
+        self.subtasks = 0
+        self.task_moves = 0
+
+        self.lock = threading.Lock()
+        self.start_time = time.monotonic()
+        self.last_log_time = self.start_time
+
+    def task_added(self) -> None:
+        with self.lock:
+            self.tasks += 1
+        self.log_progress_if_due()
+
+    def subtask_added(self) -> None:
+        with self.lock:
+            self.subtasks += 1
+        self.log_progress_if_due()
+
+    def task_moved(self) -> None:
+        with self.lock:
+            self.task_moves += 1
+        self.log_progress_if_due()
+
+    def log_progress_if_due(self) -> None:
+        now = time.monotonic()
+        with self.lock:
+            if now - self.last_log_time < self.log_interval:
+                return
+
+            self.last_log_time = now
+            progress_message = self.format_progress(now)
+
+        logging.info(progress_message)
+
+    def finish(self) -> None:
+        with self.lock:
+            progress_message = self.format_progress(time.monotonic())
+
+        logging.info(f'{progress_message} Finished.')
+
+    def format_progress(self, now: float) -> str:
+        elapsed_time = now - self.start_time
+        operations = self.tasks + self.subtasks + self.task_moves
+        operations_per_second = operations / elapsed_time if elapsed_time > 0 else 0.0
+
+        # task moves are not known in advance, so the ETA is only based on the rate of created tasks and subtasks
+        created_entities = self.tasks + self.subtasks
+        created_entities_per_second = created_entities / elapsed_time if elapsed_time > 0 else 0.0
+        remaining_entities = (self.total_tasks - self.tasks) + (self.total_subtasks - self.subtasks)
+        eta_output = 'unknown'
+        if created_entities_per_second > 0:
+            eta_output = f'{remaining_entities / created_entities_per_second:.0f}s'
+
+        return (f'Board "{self.board_title}": {self.tasks}/{self.total_tasks} tasks, {self.subtasks}/{self.total_subtasks} subtasks, '
+            f'{self.task_moves} task moves in {elapsed_time:.1f}s ({operations_per_second:.1f} operations/s, ETA {eta_output}).')
+
+def move_logging_handlers_to_background_thread(logger: logging.Logger) -> logging.handlers.QueueListener:
+    log_queue = queue.SimpleQueue()
+    handlers = list(logger.handlers)
+    for handler in handlers:
+        logger.removeHandler(handler)
+
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    queue_listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    queue_listener.start()
+    return queue_listener
@@ -0,0 +1,150 @@
+import contextlib
+import cProfile
+import logging
+import pathlib
+import re
+import threading
+import time
+from typing import Iterator, TypedDict
+
+class PhaseTiming(TypedDict):
+    calls: int
+    wall_time: float
+    cpu_time: float
+    rpc_time: float
+    rpc_calls: int
+
+class OpenPhase(TypedDict):
+    thread_id: int
+    rpc_time: float
+    rpc_calls: int
+
+profiling_enabled = False
+cprofile_output_directory: pathlib.Path | None = None
+
+phase_timings_lock = threading.Lock()
+open_phases: list[OpenPhase] = []
+board_phase_timings: dict[str, PhaseTiming] = {}
+total_phase_timings: dict[str, PhaseTiming] = {}
+
+class RpcTimingKanboardClient:
+    # wraps a kanboard.Client and measures the time spent waiting for each API call
+    def __init__(self, kanboard_client) -> None:
+        self._kanboard_client = kanboard_client
+
+    def __getattr__(self, name: str) -> any:
+        attribute = getattr(self._kanboard_client, name)
+        if not callable(attribute):
+            return attribute
+
+        def timed_call(*args, **kwargs) -> any:
+            start_time = time.perf_counter()
+            try:
+                return attribute(*args, **kwargs)
+            finally:
+                add_rpc_time(time.perf_counter() - start_time)
+
+        return timed_call
+
+def enable_profiling(cprofile_directory: str | None) -> None:
+    global profiling_enabled, cprofile_output_directory
+
+    profiling_enabled = True
+    if cprofile_directory is not None:
+        cprofile_output_directory = pathlib.Path(cprofile_directory)
+        cprofile_output_directory.mkdir(parents=True, exist_ok=True)
+
+def is_profiling_enabled() -> bool:
+    return profiling_enabled
+
+def is_cprofile_enabled() -> bool:
+    return cprofile_output_directory is not None
+
+def add_rpc_time(rpc_time: float) -> None:
+    # phases of the main thread wait for the worker threads, so they include the calls of all threads
+    thread_ids = (threading.get_ident(), threading.main_thread().ident)
+    with phase_timings_lock:
+        for open_phase in open_phases:
+            if open_phase['thread_id'] not in thread_ids:
+                continue
+
+            open_phase['rpc_time'] += rpc_time
+            open_phase['rpc_calls'] += 1
+
+def add_phase_timing(phase_timings: dict[str, PhaseTiming], phase_name: str, phase_timing: PhaseTiming) -> None:
+    accumulated_phase_timing = phase_timings.setdefault(phase_name, PhaseTiming(calls=0, wall_time=0.0, cpu_time=0.0, rpc_time=0.0, rpc_calls=0))
+    for key in phase_timing:
+        accumulated_phase_timing[key] += phase_timing[key]
+
+@contextlib.contextmanager
+def profile_phase(phase_name: str) -> Iterator[None]:
+    if not profiling_enabled:
+        yield
+        return
+
+    open_phase = OpenPhase(thread_id=threading.get_ident(), rpc_time=0.0, rpc_calls=0)
+    with phase_timings_lock:
+        open_phases.append(open_phase)
+
+    # worker threads only account for their own cpu time
+    cpu_clock = time.process_time if threading.current_thread() is threading.main_thread() else time.thread_time
+    start_wall_time = time.perf_counter()
+    start_cpu_time = cpu_clock()
+    try:
+        yield
+    finally:
+        wall_time = time.perf_counter() - start_wall_time
+        cpu_time = cpu_clock() - start_cpu_time
+
+        with phase_timings_lock:
+            # remove by identity, phases with equal timings may be open at the same time
+            open_phases[:] = [phase for phase in open_phases if phase is not open_phase]
+            phase_timing = PhaseTiming(calls=1, wall_time=wall_time, cpu_time=cpu_time, rpc_time=open_phase['rpc_time'],
+                rpc_calls=open_phase['rpc_calls'])
+            add_phase_timing(board_phase_timings, phase_name, phase_timing)
+
+@contextlib.contextmanager
+def profile_board(board_name: str) -> Iterator[None]:
+    if not profiling_enabled:
+        yield
+        return
+
+    with phase_timings_lock:
+        board_phase_timings.clear()
+
+    profiler = None
+    if cprofile_output_directory is not None:
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    try:
+        with profile_phase('board total'):
+            yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            cprofile_output_path = cprofile_output_directory / f'profile_{sanitize_file_name(board_name)}.prof'
+            profiler.dump_stats(cprofile_output_path)
+            logging.info(f'Wrote cProfile output for "{board_name}" to "{cprofile_output_path}".')
+
+        with phase_timings_lock:
+            for phase_name, phase_timing in board_phase_timings.items():
+                add_phase_timing(total_phase_timings, phase_name, phase_timing)
+
+        log_phase_timings(f'Profile of "{board_name}":', board_phase_timings)
+
+def sanitize_file_name(file_name: str) -> str:
+    return re.sub(r'[^A-Za-z0-9._-]+', '_', file_name)
+
+def log_profiling_summary() -> None:
+    if not profiling_enabled:
+        return
+
+    log_phase_timings('Profile of all boards:', total_phase_timings)
+
+def log_phase_timings(heading: str, phase_timings: dict[str, PhaseTiming]) -> None:
+    logging.info(heading)
+    # rpc wait is summed over all requests, with concurrent requests it can exceed the wall time
+    for phase_name, phase_timing in sorted(phase_timings.items(), key=lambda phase_timing_entry: phase_timing_entry[1]['wall_time'], reverse=True):
+        logging.info(f'  {phase_name}: {phase_timing['calls']} calls, wall {phase_timing['wall_time']:.3f}s, '
+            f'client cpu {phase_timing['cpu_time']:.3f}s, rpc wait {phase_timing['rpc_time']:.3f}s in {phase_timing['rpc_calls']} requests')
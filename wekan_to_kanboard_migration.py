@@ -1,3 +1,5 @@
+import argparse
+import concurrent.futures
 import configparser
 import datetime
 import itertools
@@ -7,35 +9,85 @@ import kanboard_types
 import logging
 import logging.config
 import logging.handlers
+import migration_logging
 import os
 import pathlib
+import profiling
 import pytz
+import threading
 import wekan_types
 from dotenv import load_dotenv
+from typing import Callable
 
-def init_logging() -> None:
+# per-entity records are only built when enabled with --detail-log to keep them off the migration threads otherwise
+details_logger = logging.getLogger('details')
+
+class InlineExecutor(concurrent.futures.Executor):
+    # runs every submitted call immediately on the calling thread, errors are raised immediately like without an executor
+    def submit(self, fn, /, *args, **kwargs) -> concurrent.futures.Future:
+        future = concurrent.futures.Future()
+        future.set_result(fn(*args, **kwargs))
+        return future
+
+class RequestLimitingKanboardClient:
+    # wraps a kanboard.Client and limits the number of API calls in flight across all worker threads
+    def __init__(self, kanboard_client, max_concurrent_requests: int) -> None:
+        self._kanboard_client = kanboard_client
+        self._request_semaphore = threading.BoundedSemaphore(max_concurrent_requests)
+
+    def __getattr__(self, name: str) -> any:
+        attribute = getattr(self._kanboard_client, name)
+        if not callable(attribute):
+            return attribute
+
+        def limited_call(*args, **kwargs) -> any:
+            with self._request_semaphore:
+                return attribute(*args, **kwargs)
+
+        return limited_call
+
+def init_logging(details_logging_enabled: bool, background_logging_enabled: bool) -> list[logging.handlers.QueueListener]:
     logging_conf_file = 'logging.conf'
     logging_file_handler_name = 'fileHandler'
-    logging_file_handler_section_name = f'handler_{logging_file_handler_name}'
+    logging_details_file_handler_name = 'detailsFileHandler'
     logging_file_handler_args_name = 'args'
 
+    logging_file_handler_names = [logging_file_handler_name]
+    if details_logging_enabled:
+        logging_file_handler_names.append(logging_details_file_handler_name)
+
     config = configparser.ConfigParser()
     config.read(logging_conf_file)
-    file_handler_args_str = config[logging_file_handler_section_name][logging_file_handler_args_name]
-    file_handler_args = eval(file_handler_args_str)
-    log_path_str = file_handler_args[0]
-    log_path = pathlib.Path(log_path_str)
-    log_parent_path = log_path.parent
-
-    log_parent_path.mkdir(parents=True, exist_ok=True)
-    old_log_file_exists = log_path.is_file()
+    old_log_file_exists_map: dict[str, bool] = {}
+    for file_handler_name in logging_file_handler_names:
+        file_handler_section_name = f'handler_{file_handler_name}'
+        file_handler_args_str = config[file_handler_section_name][logging_file_handler_args_name]
+        file_handler_args = eval(file_handler_args_str)
+        log_path_str = file_handler_args[0]
+        log_path = pathlib.Path(log_path_str)
+        log_parent_path = log_path.parent
+
+        log_parent_path.mkdir(parents=True, exist_ok=True)
+        old_log_file_exists_map[file_handler_name] = log_path.is_file()
 
     logging.config.fileConfig(logging_conf_file)
-    handlers = logging.getLogger().handlers
-    file_handler: handler.RotatingFileHandler | None = next((handler for handler in handlers if handler.name == logging_file_handler_name), None)
-    if file_handler is not None and old_log_file_exists:
-        # without this check if no log file exists previously, logging.config.fileConfig creates a new empty file which would be rolled over immediately
-        file_handler.doRollover()
+    details_logger.disabled = not details_logging_enabled
+
+    for file_handler_name, old_log_file_exists in old_log_file_exists_map.items():
+        file_handler: logging.handlers.RotatingFileHandler | None = logging.getHandlerByName(file_handler_name)
+        if file_handler is not None and old_log_file_exists:
+            # without this check if no log file exists previously, logging.config.fileConfig creates a new empty file which would be rolled over immediately
+            file_handler.doRollover()
+
+    if not background_logging_enabled:
+        return []
+
+    # formatting and writing log records happens in background threads to not block the migration
+    queue_listeners = [migration_logging.move_logging_handlers_to_background_thread(logging.getLogger())]
+    if details_logging_enabled:
+        queue_listeners.append(migration_logging.move_logging_handlers_to_background_thread(details_logger))
+
+    return queue_listeners
 
 def migrate() -> None:
     kanboard_api_uri = os.getenv('KANBOARD_API_URI')
@@ -43,13 +95,31 @@ def migrate() -> None:
     kanboard_api_token = os.getenv('KANBOARD_API_TOKEN')
     input_directory = os.getenv('INPUT_DIRECTORY')
     timezone_name = os.getenv('TIMEZONE_KANBOARD_SERVER')
+    max_concurrent_requests_str = os.getenv('MAX_CONCURRENT_REQUESTS')
 
     timezone = pytz.utc
     if timezone_name is not None and timezone_name != '':
         timezone = pytz.timezone(timezone_name)
 
+    max_concurrent_requests = 8
+    if max_concurrent_requests_str is not None and max_concurrent_requests_str != '':
+        max_concurrent_requests = int(max_concurrent_requests_str)
+
+    if max_concurrent_requests < 1:
+        raise ValueError(f'MAX_CONCURRENT_REQUESTS has to be at least 1 but is {max_concurrent_requests}.')
+
+    if profiling.is_cprofile_enabled():
+        # cProfile cannot be enabled for every worker thread, so it only yields usable output for a single thread
+        if max_concurrent_requests_str is not None and max_concurrent_requests_str != '' and max_concurrent_requests != 1:
+            logging.info(f'Ignoring MAX_CONCURRENT_REQUESTS of {max_concurrent_requests} and migrating single-threaded because cProfile output is captured.')
+        max_concurrent_requests = 1
+
     logging.info(f'Creating client for "{kanboard_api_uri}" with user "{kanboard_api_user}" to communicate with the Kanboard API.')
     kanboard_client = kanboard.Client(kanboard_api_uri, kanboard_api_user, kanboard_api_token, 'X-API-Auth')
+    if profiling.is_profiling_enabled():
+        kanboard_client = profiling.RpcTimingKanboardClient(kanboard_client)
+    # the column workers and the subtask workers share this limit, waiting for it is not measured as rpc wait
+    kanboard_client = RequestLimitingKanboardClient(kanboard_client, max_concurrent_requests)
 
     wekan_board_properties: dict[str, list] = {}
     for file in os.listdir(input_directory):
@@ -57,13 +127,16 @@ def migrate() -> None:
             continue
 
         json_file_path = os.path.join(input_directory, file)
-        wekan_board: wekan_types.WekanBoard = load_json(json_file_path)
-        extract_properties_dict('', wekan_board, wekan_board_properties)
+        with profiling.profile_board(file):
+            wekan_board: wekan_types.WekanBoard = load_json(json_file_path)
+            with profiling.profile_phase('extract_properties_dict'):
+                extract_properties_dict('', wekan_board, wekan_board_properties)
 
-        logging.info(f'Starting migration for JSON file "{json_file_path}".')
-        migrate_wekan_board(kanboard_client, wekan_board, timezone)
+            logging.info(f'Starting migration for JSON file "{json_file_path}".')
+            migrate_wekan_board(kanboard_client, wekan_board, timezone, max_concurrent_requests)
 
     log_wekan_board_properties_with_different_values(wekan_board_properties)
+    profiling.log_profiling_summary()
 
 def extract_properties_value(key: str, value: any, typed_dict_properties: dict[str, list]) -> None:
     wekan_board_properties_list = typed_dict_properties.get(key, [])
@@ -131,20 +204,26 @@ def log_wekan_board_properties_with_different_values_indented(typed_dict_propert
         value_output_shortened = (value_output[:(value_output_shortened_length - 3)] + '...') if len(value_output) > value_output_shortened_length else value_output
         logging.debug(f'{indent}{key}: {len(value)} different values: {value_output_shortened}')
 
-def migrate_wekan_board(kanboard_client: kanboard.Client, wekan_board: wekan_types.WekanBoard, timezone: datetime.tzinfo) -> None:
+def migrate_wekan_board(kanboard_client: kanboard.Client, wekan_board: wekan_types.WekanBoard, timezone: datetime.tzinfo, max_concurrent_requests: int) -> None:
     wekan_board_title = wekan_board['title']
 
-    kanboard_project = create_kanboard_project(kanboard_client, wekan_board_title)
-    (columns, wekan_list_id_kanboard_column_id_map) = create_kanboard_columns(kanboard_client, kanboard_project['id'], wekan_board['lists'])
-    (tasks, wekan_card_id_kanboard_task_id_map) = populate_kanboard_columns_with_tasks(kanboard_client, kanboard_project['id'], columns,
-        wekan_list_id_kanboard_column_id_map, wekan_board['cards'], timezone)
-    populate_kanboard_tasks_with_subtasks(kanboard_client, kanboard_project['id'], tasks, wekan_card_id_kanboard_task_id_map, wekan_board['checklists'],
-        wekan_board['checklistItems'])
+    with profiling.profile_phase('create_kanboard_project'):
+        kanboard_project = create_kanboard_project(kanboard_client, wekan_board_title)
+    with profiling.profile_phase('create_kanboard_columns'):
+        wekan_list_id_kanboard_column_id_map = create_kanboard_columns(kanboard_client, kanboard_project['id'], wekan_board['lists'])
+    log_merged_wekan_checklists(wekan_board['checklists'])
+    checklist_items = get_wekan_checklist_items_of_existing_cards(wekan_board['cards'], wekan_board['checklistItems'])
+    board_progress = migration_logging.BoardProgress(wekan_board_title, len(wekan_board['cards']), len(checklist_items))
+    with profiling.profile_phase('populate_kanboard_columns_with_tasks'):
+        populate_kanboard_columns_with_tasks(kanboard_client, kanboard_project['id'],
+            wekan_list_id_kanboard_column_id_map, wekan_board['cards'], checklist_items, timezone, max_concurrent_requests, board_progress)
+    board_progress.finish()
 
 def load_json(json_file_path: str) -> any:
     logging.info(f'Loading contents of JSON file "{json_file_path}".')
-    with open(json_file_path, 'r') as file:
-        return json.load(file)
+    with profiling.profile_phase('load_json'):
+        with open(json_file_path, 'r') as file:
+            return json.load(file)
 
 def create_kanboard_project(kanboard_client: kanboard.Client, project_name: str) -> kanboard_types.Project:
     project = kanboard_client.get_project_by_name(name=project_name)
@@ -167,7 +246,7 @@ def delete_all_kanboard_columns(kanboard_client: kanboard.Client, project_id: in
     for column in columns:
         kanboard_client.remove_column(column_id=column['id'])
 
-def create_kanboard_columns(kanboard_client: kanboard.Client, project_id: int, wekan_lists: list[wekan_types.WekanBoard.List]) -> (list[kanboard_types.Column], dict[str, int]):
+def create_kanboard_columns(kanboard_client: kanboard.Client, project_id: int, wekan_lists: list[wekan_types.WekanBoard.List]) -> dict[str, int]:
     columns = kanboard_client.get_columns(project_id=project_id)
 
     column_title_position_map: dict[str, int] = {}
@@ -178,18 +257,21 @@ def create_kanboard_columns(kanboard_client: kanboard.Client, project_id: int, w
         column_title_position_map[wekan_list['title']] = wekan_list['sort'] + 1
         wekan_list_id_kanboard_column_id_map[wekan_list['_id']] = column_id
 
-    columns = sort_kanboard_columns(kanboard_client, project_id, column_title_position_map)
-    return (columns, wekan_list_id_kanboard_column_id_map)
+    sort_kanboard_columns(kanboard_client, project_id, column_title_position_map)
+    return wekan_list_id_kanboard_column_id_map
 
 def create_kanboard_column(kanboard_client: kanboard.Client, project_id: int, existing_columns: list[kanboard_types.Column], column_title: str) -> int:
     column = next((column for column in existing_columns if column['title'] == column_title), None)
     if column is not None:
-        logging.info(f'Column "{column['title']}" in project with id {project_id} does already exist with id {column['id']}. Skipping creation.')
+        if details_logger.isEnabledFor(logging.INFO):
+            details_logger.info(f'Column "{column['title']}" in project with id {project_id} does already exist with id {column['id']}. Skipping creation.',
+                extra={'details': {'event': 'column_exists', 'project_id': project_id, 'column_id': column['id'], 'column_title': column_title}})
         return column['id']
 
-    logging.info(f'Creating column "{column_title}" in project with id {project_id}.')
     column_id = kanboard_client.add_column(project_id=project_id, title=column_title)
-    logging.info(f'Created column "{column_title}" with id {column_id} in project with id {project_id}.')
+    if details_logger.isEnabledFor(logging.INFO):
+        details_logger.info(f'Created column "{column_title}" with id {column_id} in project with id {project_id}.',
+            extra={'details': {'event': 'column_created', 'project_id': project_id, 'column_id': column_id, 'column_title': column_title}})
     return column_id
 
 def sort_kanboard_columns(kanboard_client: kanboard.Client, project_id: int, column_title_position_map: dict[str, int]) -> list[kanboard_types.Column]:
@@ -209,7 +291,10 @@ def sort_kanboard_columns(kanboard_client: kanboard.Client, project_id: int, col
             continue
 
         column_id = column['id']
-        logging.info(f'Moving column with id {column_id} from position {current_position} to position {target_position} in project with id {project_id}.')
+        if details_logger.isEnabledFor(logging.INFO):
+            details_logger.info(f'Moving column with id {column_id} from position {current_position} to position {target_position} in project with id {project_id}.',
+                extra={'details': {'event': 'column_moved', 'project_id': project_id, 'column_id': column_id, 'old_position': current_position,
+                    'new_position': target_position}})
         kanboard_client.change_column_position(project_id=project_id, column_id=column_id, position=target_position)
 
         update_kanboard_column_positions(columns, current_position, target_position)
@@ -249,6 +334,12 @@ def get_existing_inactive_kanboard_tasks(kanboard_client: kanboard.Client, proje
 
     return existing_inactive_tasks
 
+def get_existing_kanboard_tasks_in_column(kanboard_client: kanboard.Client, project_id: int, column_id: int) -> list[kanboard_types.Task]:
+    # the column filter of the search query accepts a column id and returns active and inactive tasks
+    existing_tasks_in_column = kanboard_client.search_tasks(project_id=project_id, query=f'column:{column_id}')
+
+    return existing_tasks_in_column
+
 def get_existing_kanboard_tasks(kanboard_client: kanboard.Client, project_id: int) -> list[kanboard_types.Task]:
     existing_active_tasks = get_existing_active_kanboard_tasks(kanboard_client, project_id)
     existing_inactive_tasks = get_existing_inactive_kanboard_tasks(kanboard_client, project_id)
@@ -256,33 +347,95 @@ def get_existing_kanboard_tasks(kanboard_client: kanboard.Client, project_id: in
     existing_tasks = [*existing_active_tasks, *existing_inactive_tasks]
     return existing_tasks
 
-def populate_kanboard_columns_with_tasks(kanboard_client: kanboard.Client, project_id: int, columns: list[kanboard_types.Column], wekan_list_id_kanboard_column_id_map: dict[str, int], cards: list[wekan_types.WekanBoard.Card], timezone: datetime.tzinfo) -> (list[kanboard_types.Task], dict[str, int]) :
+def populate_kanboard_columns_with_tasks(kanboard_client: kanboard.Client, project_id: int, wekan_list_id_kanboard_column_id_map: dict[str, int], cards: list[wekan_types.WekanBoard.Card], checklist_items: list[wekan_types.WekanBoard.ChecklistItem], timezone: datetime.tzinfo, max_concurrent_requests: int, board_progress: migration_logging.BoardProgress) -> None:
     existing_tasks = get_existing_kanboard_tasks(kanboard_client, project_id)
 
+    cards_by_list_id: dict[str, list[wekan_types.WekanBoard.Card]] = {}
+    for card in cards:
+        cards_by_list_id.setdefault(card['listId'], []).append(card)
+
+    checklist_items_by_card_id: dict[str, list[wekan_types.WekanBoard.ChecklistItem]] = {}
+    for checklist_item in checklist_items:
+        checklist_items_by_card_id.setdefault(checklist_item['cardId'], []).append(checklist_item)
+
+    # columns are processed by separate workers than subtasks, so subtasks never wait for a column to be sorted
+    with (create_executor(max_concurrent_requests) as column_executor,
+        create_executor(max_concurrent_requests) as request_executor):
+        # without cancelling, leaving the with block would run all queued columns and subtasks before the error is raised
+        def cancel_queued_work() -> None:
+            column_executor.shutdown(wait=False, cancel_futures=True)
+            request_executor.shutdown(wait=False, cancel_futures=True)
+
+        failures: list[BaseException] = []
+        def cancel_queued_work_on_failure(future: concurrent.futures.Future) -> None:
+            if not future.cancelled() and future.exception() is not None:
+                failures.append(future.exception())
+                cancel_queued_work()
+
+        try:
+            column_futures = [column_executor.submit(populate_kanboard_column_with_tasks, kanboard_client, project_id,
+                wekan_list_id_kanboard_column_id_map[list_id], existing_tasks, cards_in_list, checklist_items_by_card_id, timezone, request_executor, board_progress,
+                cancel_queued_work_on_failure)
+                for list_id, cards_in_list in cards_by_list_id.items()]
+            for column_future in column_futures:
+                column_future.add_done_callback(cancel_queued_work_on_failure)
+
+            subtask_futures: list[concurrent.futures.Future] = []
+            for column_future in column_futures:
+                subtask_futures.extend(column_future.result())
+
+            for subtask_future in subtask_futures:
+                subtask_future.result()
+        except BaseException as exception:
+            cancel_queued_work()
+            # columns failing to submit subtasks after the cancellation must not hide the error which caused it
+            if isinstance(exception, Exception) and len(failures) > 0 and exception is not failures[0]:
+                raise failures[0]
+            raise
+
+def create_executor(max_workers: int) -> concurrent.futures.Executor:
+    # with a single worker everything runs on the calling thread, e.g. to capture cProfile output
+    if max_workers == 1:
+        return InlineExecutor()
+
+    return concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+
+def populate_kanboard_column_with_tasks(kanboard_client: kanboard.Client, project_id: int, column_id: int, existing_tasks: list[kanboard_types.Task], cards: list[wekan_types.WekanBoard.Card], checklist_items_by_card_id: dict[str, list[wekan_types.WekanBoard.ChecklistItem]], timezone: datetime.tzinfo, request_executor: concurrent.futures.Executor, board_progress: migration_logging.BoardProgress, subtask_done_callback: Callable[[concurrent.futures.Future], None]) -> list[concurrent.futures.Future]:
     task_id_position_map: dict[int, int] = {}
-    wekan_card_id_kanboard_task_id_map: dict[str, int] = {}
+    subtask_futures: list[concurrent.futures.Future] = []
     for card in cards:
-        list_id = card['listId']
-        column_id = wekan_list_id_kanboard_column_id_map[list_id]
-        task_id = add_kanboard_task(kanboard_client, project_id, column_id, existing_tasks, card, timezone)
+        (task_id, task_created) = add_kanboard_task(kanboard_client, project_id, column_id, existing_tasks, card, timezone)
+        board_progress.task_added()
         task_id_position_map[task_id] = card['sort']
-        wekan_card_id_kanboard_task_id_map[card['_id']] = task_id
 
-    tasks = sort_active_kanboard_tasks(kanboard_client, project_id, task_id_position_map)
-    return (tasks, wekan_card_id_kanboard_task_id_map)
+        # closed inline, sorting depends on the positions of closed tasks and waiting behind queued subtasks would delay it
+        if task_created and card['archived']:
+            close_kanboard_task(kanboard_client, task_id)
 
-def add_kanboard_task(kanboard_client: kanboard.Client, project_id: int, column_id: int, existing_tasks: list[kanboard_types.Task], card: wekan_types.WekanBoard.Card, timezone: datetime.tzinfo) -> int:
+        checklist_items_of_card = checklist_items_by_card_id.get(card['_id'], [])
+        if len(checklist_items_of_card) > 0:
+            subtask_future = request_executor.submit(populate_kanboard_task_with_subtasks, kanboard_client, project_id, task_id,
+                checklist_items_of_card, board_progress)
+            subtask_future.add_done_callback(subtask_done_callback)
+            subtask_futures.append(subtask_future)
+
+    with profiling.profile_phase('sort_active_kanboard_tasks_in_column'):
+        sort_active_kanboard_tasks_in_column(kanboard_client, project_id, column_id, task_id_position_map, board_progress)
+    return subtask_futures
+
+def add_kanboard_task(kanboard_client: kanboard.Client, project_id: int, column_id: int, existing_tasks: list[kanboard_types.Task], card: wekan_types.WekanBoard.Card, timezone: datetime.tzinfo) -> (int, bool):
     existing_task = next((task for task in existing_tasks if task['title'] == card['title']), None)
     if existing_task is not None:
         logging.warning(f'Task "{card['title']}" in project with id {project_id} does already exist with id {existing_task['id']}. It is not ensured that all attributes are correct. Skipping creation.')
-        return existing_task['id']
+        return (existing_task['id'], False)
 
     card_due_at_str = card.get('dueAt', '')
     task_date_due = None
     if card_due_at_str != '':
-        card_due_at_date_utc = datetime.datetime.fromisoformat(card_due_at_str)
-        card_due_at_date = card_due_at_date_utc.astimezone(timezone)
-        task_date_due = card_due_at_date.strftime('%Y-%m-%d %H:%M')
+        with profiling.profile_phase('convert_task_date_due'):
+            card_due_at_date_utc = datetime.datetime.fromisoformat(card_due_at_str)
+            card_due_at_date = card_due_at_date_utc.astimezone(timezone)
+            task_date_due = card_due_at_date.strftime('%Y-%m-%d %H:%M')
 
     task_id = kanboard_client.create_task(
         title=card['title'],
@@ -291,55 +444,58 @@ def add_kanboard_task(kanboard_client: kanboard.Client, project_id: int, column_
         date_due=task_date_due,
         description=card.get('description', '')
     )
+    if details_logger.isEnabledFor(logging.INFO):
+        details_logger.info(f'Created task "{card['title']}" with id {task_id} in column with id {column_id} in project with id {project_id}.',
+            extra={'details': {'event': 'task_created', 'project_id': project_id, 'column_id': column_id, 'task_id': task_id, 'wekan_card_id': card['_id']}})
 
-    if card['archived']:
-        kanboard_client.close_task(task_id=task_id)
+    return (task_id, True)
 
-    return task_id
+def close_kanboard_task(kanboard_client: kanboard.Client, task_id: int) -> None:
+    with profiling.profile_phase('close_kanboard_task'):
+        kanboard_client.close_task(task_id=task_id)
 
-def move_closed_kanboard_tasks_to_end_of_column(kanboard_client: kanboard.Client, project_id: int) -> None:
-    existing_active_tasks = get_existing_active_kanboard_tasks(kanboard_client, project_id)
-    existing_inactive_tasks = get_existing_inactive_kanboard_tasks(kanboard_client, project_id)
+def is_kanboard_task_active(task: kanboard_types.Task) -> bool:
+    return int(task['is_active']) == 1
 
-    existing_inactive_tasks.sort(key=lambda task: task['column_id'])
+def move_closed_kanboard_tasks_to_end_of_column(kanboard_client: kanboard.Client, project_id: int, tasks_in_column: list[kanboard_types.Task], board_progress: migration_logging.BoardProgress) -> None:
+    active_tasks_in_column = filter(lambda task: is_kanboard_task_active(task), tasks_in_column)
+    inactive_tasks_in_column = [task for task in tasks_in_column if not is_kanboard_task_active(task)]
+    inactive_tasks_position = max(map(lambda active_task_in_column: active_task_in_column['position'], active_tasks_in_column), default=0) + 1
 
-    for column_id, inactive_tasks in itertools.groupby(existing_inactive_tasks, key=lambda task: task['column_id']):
-        active_tasks_in_column = filter(lambda active_task: active_task['column_id'] == column_id, existing_active_tasks)
-        inactive_tasks_position = max(map(lambda active_task_in_column: active_task_in_column['position'], active_tasks_in_column), default=0) + 1
+    for inactive_task in inactive_tasks_in_column:
+        task_id = inactive_task['id']
+        swimlane_id = inactive_task['swimlane_id']
 
-        for inactive_task in inactive_tasks:
-            task_id = inactive_task['id']
-            swimlane_id = inactive_task['swimlane_id']
+        kanboard_client.move_task_position(
+            project_id=project_id,
+            task_id=task_id,
+            column_id=inactive_task['column_id'],
+            position=inactive_tasks_position,
+            swimlane_id=swimlane_id
+        )
+        board_progress.task_moved()
 
-            kanboard_client.move_task_position(
-                project_id=project_id,
-                task_id=task_id,
-                column_id=column_id,
-                position=inactive_tasks_position,
-                swimlane_id=swimlane_id
-            )
+        inactive_tasks_position += 1
 
-            inactive_tasks_position += 1
+def sort_active_kanboard_tasks_in_column(kanboard_client: kanboard.Client, project_id: int, column_id: int, task_id_position_map: dict[int, int], board_progress: migration_logging.BoardProgress) -> list[kanboard_types.Task]:
+    tasks_in_column = get_existing_kanboard_tasks_in_column(kanboard_client, project_id, column_id)
 
-def sort_active_kanboard_tasks(kanboard_client: kanboard.Client, project_id: int, task_id_position_map: dict[int, int]) -> list[kanboard_types.Task]:
     # move closed tasks to end to prevent sorting issues
-    move_closed_kanboard_tasks_to_end_of_column(kanboard_client, project_id)
-
-    existing_active_tasks = get_existing_active_kanboard_tasks(kanboard_client, project_id)
-    existing_active_tasks.sort(key=lambda task: task['column_id'])
+    move_closed_kanboard_tasks_to_end_of_column(kanboard_client, project_id, tasks_in_column, board_progress)
 
-    sorted_tasks: list[kanboard_types.Task] = []
-    for column_id, tasks in itertools.groupby(existing_active_tasks, key=lambda task: task['column_id']):
-        tasks_list = list(tasks)
-        task_ids = list(map(lambda task: task['id'], tasks_list))
-        task_id_position_map_for_column = {task_id: position for task_id, position in task_id_position_map.items()
-            if task_id in task_ids}
-        sorted_tasks_in_column = sort_kanboard_tasks_in_column(kanboard_client, project_id, column_id, tasks_list, task_id_position_map_for_column)
-        sorted_tasks.extend(sorted_tasks_in_column)
+    # fetched again because the positions after the move are only known to Kanboard
+    tasks_in_column = get_existing_kanboard_tasks_in_column(kanboard_client, project_id, column_id)
+    active_tasks_in_column = [task for task in tasks_in_column if is_kanboard_task_active(task)]
+    if len(active_tasks_in_column) == 0:
+        return []
 
-    return sorted_tasks
+    task_ids = list(map(lambda task: task['id'], active_tasks_in_column))
+    task_id_position_map_for_column = {task_id: position for task_id, position in task_id_position_map.items()
+        if task_id in task_ids}
+    return sort_kanboard_tasks_in_column(kanboard_client, project_id, column_id, active_tasks_in_column,
+        task_id_position_map_for_column, board_progress)
 
-def sort_kanboard_tasks_in_column(kanboard_client: kanboard.Client, project_id: int, column_id: int, tasks: list[kanboard_types.Task], task_id_position_map: dict[int, int]) -> list[kanboard_types.Task]:
+def sort_kanboard_tasks_in_column(kanboard_client: kanboard.Client, project_id: int, column_id: int, tasks: list[kanboard_types.Task], task_id_position_map: dict[int, int], board_progress: migration_logging.BoardProgress) -> list[kanboard_types.Task]:
     for index, (task_id, position) in enumerate(sorted(task_id_position_map.items(), key=lambda task_id_position_entry: task_id_position_entry[1])):
         task_id_position_map[task_id] = index + 1
 
@@ -351,7 +507,10 @@ def sort_kanboard_tasks_in_column(kanboard_client: kanboard.Client, project_id:
 
         task_id = task['id']
         swimlane_id = task['swimlane_id']
-        logging.info(f'Moving task with id {task_id} from position {current_position} to position {target_position} in column with id {column_id} in project with id {project_id}.')
+        if details_logger.isEnabledFor(logging.INFO):
+            details_logger.info(f'Moving task with id {task_id} from position {current_position} to position {target_position} in column with id {column_id} in project with id {project_id}.',
+                extra={'details': {'event': 'task_moved', 'project_id': project_id, 'column_id': column_id, 'task_id': task_id,
+                    'old_position': current_position, 'new_position': target_position}})
         kanboard_client.move_task_position(
             project_id=project_id,
             task_id=task_id,
@@ -359,8 +518,10 @@ def sort_kanboard_tasks_in_column(kanboard_client: kanboard.Client, project_id:
             position=target_position,
             swimlane_id=swimlane_id
         )
+        board_progress.task_moved()
 
-        update_kanboard_task_positions(tasks, current_position, target_position)
+        with profiling.profile_phase('update_kanboard_task_positions'):
+            update_kanboard_task_positions(tasks, current_position, target_position)
 
     return tasks
 
@@ -387,7 +548,7 @@ def update_kanboard_task_positions(tasks: list[kanboard_types.Task], old_positio
 
         task['position'] += position_correction
 
-def populate_kanboard_tasks_with_subtasks(kanboard_client: kanboard.Client, project_id: int, tasks: list[kanboard_types.Task], wekan_card_id_kanboard_task_id_map: dict[str, int], checklists: list[wekan_types.WekanBoard.Checklist], checklist_items: list[wekan_types.WekanBoard.ChecklistItem]) -> None:
+def log_merged_wekan_checklists(checklists: list[wekan_types.WekanBoard.Checklist]) -> None:
     if len(checklists) == 0:
         return
 
@@ -402,17 +563,34 @@ def populate_kanboard_tasks_with_subtasks(kanboard_client: kanboard.Client, proj
         joined_checklists_group_titles = ', '.join(checklists_group_titles)
         logging.warning(f'Checklists with titles {joined_checklists_group_titles} for Wekan card with id {card_id} are merged.')
 
+def get_wekan_checklist_items_of_existing_cards(cards: list[wekan_types.WekanBoard.Card], checklist_items: list[wekan_types.WekanBoard.ChecklistItem]) -> list[wekan_types.WekanBoard.ChecklistItem]:
+    card_ids = set(map(lambda card: card['_id'], cards))
+
+    checklist_items_of_existing_cards: list[wekan_types.WekanBoard.ChecklistItem] = []
     for checklist_item in checklist_items:
-        card_id = checklist_item['cardId']
-        task_id = wekan_card_id_kanboard_task_id_map[card_id]
-        subtask_id = add_kanboard_subtask(kanboard_client, project_id, task_id, checklist_item)
+        if checklist_item['cardId'] not in card_ids:
+            logging.warning(f'Checklist item "{checklist_item['title']}" with id {checklist_item['_id']} belongs to Wekan card with id {checklist_item['cardId']} which does not exist. Skipping creation.')
+            continue
+
+        checklist_items_of_existing_cards.append(checklist_item)
+
+    return checklist_items_of_existing_cards
+
+def populate_kanboard_task_with_subtasks(kanboard_client: kanboard.Client, project_id: int, task_id: int, checklist_items: list[wekan_types.WekanBoard.ChecklistItem], board_progress: migration_logging.BoardProgress) -> None:
+    # subtasks of one task are created in order to retain the order of the checklist items
+    with profiling.profile_phase('populate_kanboard_task_with_subtasks'):
+        for checklist_item in checklist_items:
+            subtask_id = add_kanboard_subtask(kanboard_client, project_id, task_id, checklist_item)
+            board_progress.subtask_added()
 
 def add_kanboard_subtask(kanboard_client: kanboard.Client, project_id: int, task_id: int, checklist_item: wekan_types.WekanBoard.ChecklistItem) -> int:
     existing_subtasks_of_task: list[kanboard_types.Subtask] = kanboard_client.get_all_subtasks(task_id=task_id)
     existing_subtask_with_title = next((subtask for subtask in existing_subtasks_of_task if subtask['title'] == checklist_item['title']), None)
     if existing_subtask_with_title is not None:
         subtask_id = existing_subtask_with_title['id']
-        logging.info(f'Subtask "{checklist_item['title']}" in project with id {project_id} does already exist with id {subtask_id}. Skipping creation.')
+        if details_logger.isEnabledFor(logging.INFO):
+            details_logger.info(f'Subtask "{checklist_item['title']}" in project with id {project_id} does already exist with id {subtask_id}. Skipping creation.',
+                extra={'details': {'event': 'subtask_exists', 'project_id': project_id, 'task_id': task_id, 'subtask_id': subtask_id}})
         actual_status = existing_subtask_with_title['status']
         expected_status = 1 if checklist_item['isFinished'] else 0
         check_correct_kanboard_subtask_status(subtask_id, actual_status, expected_status)
@@ -427,6 +605,10 @@ def add_kanboard_subtask(kanboard_client: kanboard.Client, project_id: int, task
         title=checklist_item['title'],
         status=subtask_status.value
     )
+    if details_logger.isEnabledFor(logging.INFO):
+        details_logger.info(f'Created subtask "{checklist_item['title']}" with id {subtask_id} for task with id {task_id} in project with id {project_id}.',
+            extra={'details': {'event': 'subtask_created', 'project_id': project_id, 'task_id': task_id, 'subtask_id': subtask_id,
+                'wekan_checklist_item_id': checklist_item['_id']}})
 
     return subtask_id
 
@@ -434,11 +616,33 @@ def check_correct_kanboard_subtask_status(subtask_id: int, actual_status: int, e
     if actual_status != expected_status:
         logging.warning(f'Subtask with id {subtask_id} was expected to have status {expected_status} but has status {actual_status}.')
 
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Migrate Wekan boards exported as JSON files to Kanboard.')
+    parser.add_argument('--profile', action='store_true',
+        help='log a per-phase timing breakdown for every board, separating client-side time from time spent waiting on Kanboard API calls')
+    parser.add_argument('--cprofile', action='store_true',
+        help='additionally write cProfile output for every board to the logs directory, implies --profile, '
+            'the migration runs single-threaded with synchronous logging to keep the output usable, so the profile includes '
+            'log formatting and I/O and does not reflect the concurrency of a normal run')
+    parser.add_argument('--detail-log', action='store_true',
+        help='write every created or moved column, task and subtask as structured JSON to a separate log file')
+    return parser.parse_args()
+
 def main() -> None:
+    arguments = parse_arguments()
     load_dotenv()
-    init_logging()
-
-    migrate()
+    queue_listeners = init_logging(arguments.detail_log, not arguments.cprofile)
+
+    try:
+        if arguments.profile or arguments.cprofile:
+            cprofile_directory = 'logs' if arguments.cprofile else None
+            profiling.enable_profiling(cprofile_directory)
+
+        migrate()
+    finally:
+        # flushes all log records which are still queued
+        for queue_listener in queue_listeners:
+            queue_listener.stop()
 
 if __name__ == '__main__':
     main()